@@ -56,7 +56,7 @@ class OrbitalAgent:
             data_loader: DataLoader instance for data access
             dataset_storage: DatasetStorage instance for Phase 2 tools
             database_url: Database URL for Phase 2 tools
-            storage: FileStorage for session memory persistence
+            storage: PgSessionStorage for session memory persistence
         """
         self.client = client
         self.provider = provider
@@ -90,7 +90,10 @@ class OrbitalAgent:
             if tool_name == "get_schema":
                 result = self._schema_tool.execute()
             elif tool_name == "get_stats":
-                result = self._stats_tool.execute(table=tool_input["table"])
+                result = self._stats_tool.execute(
+                    table=tool_input["table"],
+                    include_percentiles=tool_input.get("include_percentiles", False),
+                )
             elif tool_name == "run_sql":
                 result = self._sql_tool.execute(sql=tool_input["sql"])
             elif tool_name == "create_chart":
@@ -168,9 +171,16 @@ class OrbitalAgent:
         """
         # Use provider-based processing if available
         if self.provider:
-            return await self._process_with_provider(
-                message, conversation_id, max_turns, history
-            )
+            # Tables may have changed since the last turn through other connections
+            self._sql_tool.clear_cache()
+            try:
+                return await self._process_with_provider(
+                    message, conversation_id, max_turns, history
+                )
+            finally:
+                # Persist memory updates deferred during the turn in one write
+                if self._storage and self._current_session_id:
+                    self._storage.flush(self._current_session_id)
 
         raise ValueError("No LLM provider configured")
 
@@ -20,7 +20,15 @@ SCHEMA_TOOL_DEFINITIONS = [
         "input_schema": {
             "type": "object",
             "properties": {
-                "table": {"type": "string", "description": "Name of the table to analyze"}
+                "table": {"type": "string", "description": "Name of the table to analyze"},
+                "include_percentiles": {
+                    "type": "boolean",
+                    "description": (
+                        "Also compute 25th/50th/75th percentiles for numeric columns "
+                        "(default: false)"
+                    ),
+                    "default": False,
+                },
             },
             "required": ["table"],
         },
@@ -155,7 +163,8 @@ TRAIN_MODEL_TOOL_DEFINITIONS = [
             "Use when you want to:\n"
             "- Predict a numeric or categorical target from other columns\n"
             "- Measure how well available features explain a target (R2, accuracy)\n"
-            "- Identify which features matter most (feature importances)\n"
+            "- Identify which features matter most (feature importances; permutation-based "
+            "for gradient_boosting, measured on the test split)\n"
             "- Analyze prediction errors (residuals) to discover missing patterns"
         ),
         "input_schema": {
@@ -1,6 +1,6 @@
 """DataLoader - Unified data access layer."""
 
-from typing import Optional
+from typing import Callable, Optional
 
 import pandas as pd
 
@@ -28,6 +28,11 @@ class DataLoader:
             dataset_ids=dataset_ids,
         )
 
+    @property
+    def data_version(self) -> int:
+        """Counter that changes whenever tables are created, replaced or dropped."""
+        return self._connector.data_version
+
     def list_tables(self) -> list[str]:
         """List source tables."""
         return self._connector.list_tables()
@@ -48,6 +53,14 @@ class DataLoader:
         """Get schema for all tables (source + derived)."""
         return self._connector.get_schema()
 
+    def get_table_schema(self, table_name: str) -> dict:
+        """Get columns, types and row count for a single table."""
+        return self._connector.get_table_schema(table_name)
+
+    def query_table(self, table_name: str, build_sql: Callable[[str], str]) -> dict:
+        """Run read-only SQL built around one table's quoted PostgreSQL name."""
+        return self._connector.query_table(table_name, build_sql)
+
     def register_dataframe(self, name: str, df: pd.DataFrame) -> None:
         """Register a DataFrame as a queryable table."""
         self._connector.register_dataframe(name, df)
@@ -1,10 +1,19 @@
 """PostgreSQL-based connector for querying data via SQL."""
 
-from typing import Optional
+import re
+from typing import Callable, Optional
 
 import pandas as pd
 import psycopg
 
+from app.utils.sql_security import quote_identifier
+
+# CREATE ... TABLE statements, matched case-insensitively without uppercasing the query
+_CREATE_TABLE_RE = re.compile(r"CREATE.*?TABLE", re.IGNORECASE | re.DOTALL)
+
+# Data-modifying statements, including ones hidden in a CTE (WITH d AS (DELETE ... RETURNING ...))
+_WRITE_RE = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE|TRUNCATE)\b", re.IGNORECASE)
+
 
 class PostgreSQLConnector:
     """
@@ -22,6 +31,7 @@ class PostgreSQLConnector:
         self._dataset_ids = dataset_ids or []
         self._dataset_tables: dict[str, str] = {}  # short_name → pg_table_name
         self._conn: Optional[psycopg.Connection] = None
+        self._data_version = 0  # bumped on every write through this connector
 
     @property
     def conn(self) -> psycopg.Connection:
@@ -30,6 +40,16 @@ class PostgreSQLConnector:
             self._conn = psycopg.connect(self._database_url, autocommit=False)
         return self._conn
 
+    @property
+    def data_version(self) -> int:
+        """
+        Counter that changes whenever this connector creates, alters or drops data.
+
+        Only writes made through this connector are seen; changes from other
+        connections are not, so caches keyed on it must not outlive a request.
+        """
+        return self._data_version
+
     def list_tables(self) -> list[str]:
         """List tables available to this session (from attached datasets only).
 
@@ -77,11 +97,7 @@ class PostgreSQLConnector:
 
     def get_table(self, table_name: str, limit: Optional[int] = None) -> pd.DataFrame:
         """Load a table as DataFrame."""
-        actual_name = table_name
-        if table_name in self._derived_tables:
-            actual_name = f"{self._derived_prefix}{table_name}"
-        elif table_name in self._dataset_tables:
-            actual_name = self._dataset_tables[table_name]
+        actual_name = self._resolve_table_name(table_name) or table_name
 
         limit_clause = f" LIMIT {limit}" if limit else ""
         try:
@@ -116,7 +132,6 @@ class PostgreSQLConnector:
         - PermissionError: If SQL references tables not in attached datasets
         """
         sql_stripped = sql.strip()
-        sql_upper = sql_stripped.upper()
 
         # Discover tables first (needed for access check)
         self._discover_dataset_tables()
@@ -124,7 +139,7 @@ class PostgreSQLConnector:
 
         # Detect CREATE TABLE to track it
         created_table = None
-        if sql_upper.startswith("CREATE") and "TABLE" in sql_upper:
+        if _CREATE_TABLE_RE.match(sql_stripped):
             created_table = self._extract_table_name(sql_stripped)
             if created_table:
                 prefixed_name = f"{self._derived_prefix}{created_table}"
@@ -136,10 +151,20 @@ class PostgreSQLConnector:
         # Rewrite short names to prefixed names
         sql_stripped = self._rewrite_derived_refs(sql_stripped)
 
+        # Anything but a single row-returning, non-modifying query may change data
+        may_write = (
+            created_table is not None
+            or ";" in sql_stripped.rstrip().rstrip(";")
+            or _WRITE_RE.search(sql_stripped) is not None
+        )
+
         try:
             with self.conn.cursor() as cur:
                 cur.execute(sql_stripped)
 
+                if may_write or cur.description is None:
+                    self._data_version += 1
+
                 # Track derived table
                 if created_table and created_table not in self._derived_tables:
                     self._derived_tables.append(created_table)
@@ -200,8 +225,6 @@ class PostgreSQLConnector:
 
     def _rewrite_derived_refs(self, sql: str) -> str:
         """Replace short derived/dataset table names with prefixed names in SQL."""
-        import re
-
         for short_name in self._derived_tables:
             prefixed = f"{self._derived_prefix}{short_name}"
             if short_name in sql and prefixed not in sql:
@@ -230,7 +253,6 @@ class PostgreSQLConnector:
         Raises:
             PermissionError: If SQL references unauthorized tables
         """
-        import re
 
         # Build set of allowed table names
         allowed = set(self._dataset_tables.keys()) | set(self._derived_tables)
@@ -307,6 +329,51 @@ class PostgreSQLConnector:
 
         return schema
 
+    def get_table_schema(self, table_name: str) -> dict:
+        """Get columns, types and row count for one attached or derived table."""
+        self._discover_dataset_tables()
+        self._discover_derived_tables()
+        actual_name = self._resolve_table_name(table_name)
+        if actual_name is None:
+            return {"error": f"Table '{table_name}' not found"}
+        return self._get_table_schema(actual_name)
+
+    def query_table(self, table_name: str, build_sql: Callable[[str], str]) -> dict:
+        """
+        Run read-only SQL built by the caller against one attached or derived table.
+
+        build_sql receives the quoted PostgreSQL table name; the result is not passed
+        through the access check or the derived-name rewrite, so callers must quote
+        every identifier they put in it. Returns data, columns and row_count like
+        execute_sql, or an error if the table is unknown.
+        """
+        self._discover_dataset_tables()
+        self._discover_derived_tables()
+        actual_name = self._resolve_table_name(table_name)
+        if actual_name is None:
+            return {"error": f"Table '{table_name}' not found"}
+
+        sql = build_sql(quote_identifier(actual_name))
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql)
+                columns = [desc[0] for desc in cur.description]
+                rows = cur.fetchall()
+            self.conn.rollback()
+        except Exception:
+            self.conn.rollback()
+            raise
+        data = [dict(zip(columns, row)) for row in rows]
+        return {"data": data, "columns": columns, "row_count": len(data)}
+
+    def _resolve_table_name(self, table_name: str) -> Optional[str]:
+        """Map a short table name to its PostgreSQL name, or None if unknown."""
+        if table_name in self._derived_tables:
+            return f"{self._derived_prefix}{table_name}"
+        if table_name in self._dataset_tables:
+            return self._dataset_tables[table_name]
+        return None
+
     def _get_table_schema(self, name: str) -> dict:
         """Get schema for a single table."""
         try:
@@ -353,6 +420,7 @@ class PostgreSQLConnector:
                     copy.write_row(row)
 
             self.conn.commit()
+        self._data_version += 1
 
         if name not in self._derived_tables:
             self._derived_tables.append(name)
@@ -386,6 +454,7 @@ class PostgreSQLConnector:
             except Exception:
                 pass
         self._derived_tables.clear()
+        self._data_version += 1
 
     def close(self) -> None:
         """Close the connection without dropping derived tables.
@@ -11,7 +11,7 @@ class DataSnapshot(BaseModel):
     """Frozen data captured when artifact was created."""
 
     query: str | None = None
-    data: list[Any] = []
+    data: dict[str, list[Any]] | list[Any] = []  # column -> values; row lists in older reports
     columns: list[str] = []
     rowCount: int = 0
     capturedAt: str
@@ -8,6 +8,24 @@ from typing import Optional
 
 import psycopg
 
+# Session keys whose updates fully replace the stored value, so repeated
+# deferred patches can be merged last-write-wins before hitting the database.
+_DEFERRABLE_KEYS = frozenset({"name", "memory", "historySummary", "historySummaryUpToIndex"})
+
+# Row inserts shared by the create_* methods and bulk test setup (see new_*_row)
+INSERT_SESSION_SQL = """
+    INSERT INTO sessions (id, name, data_source, created_by, data, created_at, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+INSERT_ARTIFACT_SQL = """
+    INSERT INTO artifacts (id, session_id, insight_id, name, description, data_source, data, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+_SESSION_RETURNING = "RETURNING id, name, data_source, created_by, data, created_at, updated_at"
+_ARTIFACT_RETURNING = (
+    "RETURNING id, session_id, insight_id, name, description, data_source, data, created_at"
+)
+
 
 class PgSessionStorage:
     """
@@ -15,11 +33,16 @@ class PgSessionStorage:
 
     Replaces FileStorage with database-backed persistence.
     Follows the same interface so routers/agent need no logic changes.
+
+    Each operation runs in its own conn.transaction() block: it commits on an
+    idle connection and becomes a savepoint inside a caller's open transaction.
     """
 
     def __init__(self, database_url: str):
         self._database_url = database_url
         self._conn: Optional[psycopg.Connection] = None
+        # session_id → merged updates not yet written (see update_session_deferred)
+        self._pending: dict[str, dict] = {}
 
     @property
     def conn(self) -> psycopg.Connection:
@@ -29,7 +52,7 @@ class PgSessionStorage:
 
     def initialize(self) -> None:
         """Create sessions and artifacts tables if they don't exist."""
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS sessions (
                     id TEXT PRIMARY KEY,
@@ -53,11 +76,11 @@ class PgSessionStorage:
                     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
                 )
             """)
-        self.conn.commit()
 
     def close(self) -> None:
-        """Close the database connection."""
+        """Flush deferred updates and close the database connection."""
         if self._conn is not None and not self._conn.closed:
+            self.flush()
             self._conn.close()
             self._conn = None
 
@@ -83,13 +106,13 @@ class PgSessionStorage:
 
     # ── sessions ─────────────────────────────────────────────
 
-    def create_session(self, data_source: str, name: str) -> dict:
+    def new_session_row(self, data_source: str, name: str) -> tuple:
+        """Parameters for INSERT_SESSION_SQL describing a new, empty session."""
         name = name.strip() if name else ""
         if not name:
             name = "Untitled Session"
 
         now = self._now_iso()
-        session_id = self._generate_id()
         data = {
             "messages": [],
             "insights": [],
@@ -101,39 +124,41 @@ class PgSessionStorage:
                 "conclusions": [],
             },
         }
+        return (
+            self._generate_id(), name, data_source, self._get_current_user(),
+            json.dumps(data), now, now,
+        )
 
-        with self.conn.cursor() as cur:
+    def create_session(self, data_source: str, name: str) -> dict:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
-                """
-                INSERT INTO sessions (id, name, data_source, created_by, data, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                RETURNING id, name, data_source, created_by, data, created_at, updated_at
-                """,
-                (session_id, name, data_source, self._get_current_user(), json.dumps(data), now, now),
+                INSERT_SESSION_SQL + _SESSION_RETURNING,
+                self.new_session_row(data_source, name),
             )
             row = cur.fetchone()
-        self.conn.commit()
         return self._session_row_to_dict(row)
 
     def get_session(self, session_id: str) -> dict | None:
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
                 "SELECT id, name, data_source, created_by, data, created_at, updated_at FROM sessions WHERE id = %s",
                 (session_id,),
             )
             row = cur.fetchone()
-        self.conn.rollback()
         if row is None:
             return None
-        return self._session_row_to_dict(row)
+        session = self._session_row_to_dict(row)
+        pending = self._pending.get(session_id)
+        if pending:
+            session.update(pending)
+        return session
 
     def list_sessions(self) -> list[dict]:
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
                 "SELECT id, name, data_source, created_by, data, created_at, updated_at FROM sessions ORDER BY updated_at DESC"
             )
             rows = cur.fetchall()
-        self.conn.rollback()
 
         summaries = []
         for row in rows:
@@ -156,8 +181,13 @@ class PgSessionStorage:
         return summaries
 
     def update_session(self, session_id: str, updates: dict) -> dict | None:
+        # Fold in any deferred patches so they land in this same write
+        pending = self._pending.pop(session_id, None)
+        if pending:
+            updates = {**pending, **updates}
+
         # Fetch current row
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
                 "SELECT id, name, data_source, created_by, data, created_at, updated_at FROM sessions WHERE id = %s",
                 (session_id,),
@@ -165,7 +195,6 @@ class PgSessionStorage:
             row = cur.fetchone()
 
         if row is None:
-            self.conn.rollback()
             return None
 
         session = self._session_row_to_dict(row)
@@ -238,7 +267,7 @@ class PgSessionStorage:
                     break
 
         now = self._now_iso()
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
                 """
                 UPDATE sessions SET name = %s, data = %s, updated_at = %s
@@ -248,23 +277,60 @@ class PgSessionStorage:
                 (name, json.dumps(data), now, session_id),
             )
             row = cur.fetchone()
-        self.conn.commit()
         if row is None:
             return None
         return self._session_row_to_dict(row)
 
+    def update_session_deferred(self, session_id: str, updates: dict) -> None:
+        """
+        Queue a session update to be written on the next flush.
+
+        Only replacement-style keys (name, memory, history summary) can be
+        deferred; patches for the same session are merged last-write-wins.
+        Queued values are overlaid onto get_session results, so readers see
+        them before they are persisted. Call flush() at the end of a turn.
+        """
+        unsupported = updates.keys() - _DEFERRABLE_KEYS
+        if unsupported:
+            raise ValueError(f"Cannot defer session updates: {sorted(unsupported)}")
+        self._pending.setdefault(session_id, {}).update(updates)
+
+    def get_memory(self, session_id: str) -> dict | None:
+        """
+        Return a session's memory, skipping the database read when an update is queued.
+
+        None means the session does not exist; a legacy session stored with a
+        null memory gets an empty dict so callers can fill in the defaults.
+        """
+        pending = self._pending.get(session_id)
+        if pending and "memory" in pending:
+            return pending["memory"]
+        session = self.get_session(session_id)
+        if session is None:
+            return None
+        return session["memory"] or {}
+
+    def flush(self, session_id: str | None = None) -> None:
+        """Write deferred updates for one session, or for all sessions if None."""
+        if session_id is None:
+            session_ids = list(self._pending)
+        else:
+            session_ids = [session_id] if session_id in self._pending else []
+        for sid in session_ids:
+            self.update_session(sid, {})
+
     def delete_session(self, session_id: str) -> bool:
-        with self.conn.cursor() as cur:
+        self._pending.pop(session_id, None)
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute("DELETE FROM sessions WHERE id = %s", (session_id,))
             deleted = cur.rowcount > 0
-        self.conn.commit()
         return deleted
 
     def delete_empty_sessions(self) -> int:
         """Delete sessions with zero user messages."""
         # We need to find sessions where JSONB data->'messages' has no user messages.
         # Use a subquery to filter.
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute("""
                 DELETE FROM sessions
                 WHERE id IN (
@@ -276,18 +342,16 @@ class PgSessionStorage:
                 )
             """)
             deleted = cur.rowcount
-        self.conn.commit()
         return deleted
 
     # ── artifacts ────────────────────────────────────────────
 
     def list_artifacts(self) -> list[dict]:
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
                 "SELECT id, session_id, insight_id, name, description, data_source, data, created_at FROM artifacts ORDER BY created_at DESC"
             )
             rows = cur.fetchall()
-        self.conn.rollback()
 
         summaries = []
         for row in rows:
@@ -311,17 +375,36 @@ class PgSessionStorage:
         return summaries
 
     def get_artifact(self, artifact_id: str) -> dict | None:
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
                 "SELECT id, session_id, insight_id, name, description, data_source, data, created_at FROM artifacts WHERE id = %s",
                 (artifact_id,),
             )
             row = cur.fetchone()
-        self.conn.rollback()
         if row is None:
             return None
         return self._artifact_row_to_dict(row)
 
+    def new_artifact_row(
+        self,
+        session_id: str,
+        insight_id: str | None,
+        name: str,
+        description: str,
+        data_source: str,
+        visualization: dict,
+        data_snapshot: dict,
+    ) -> tuple:
+        """Parameters for INSERT_ARTIFACT_SQL describing a new artifact."""
+        artifact_data = {
+            "visualization": visualization,
+            "dataSnapshot": data_snapshot,
+        }
+        return (
+            self._generate_id(), session_id, insight_id, name, description, data_source,
+            json.dumps(artifact_data), self._now_iso(),
+        )
+
     def create_artifact(
         self, session_id: str, insight_id: str, name: str, description: str
     ) -> dict | None:
@@ -339,25 +422,15 @@ class PgSessionStorage:
 
         visualization = insight.get("visualization", {})
         data_snapshot = self._create_data_snapshot(visualization)
+        params = self.new_artifact_row(
+            session_id, insight_id, name, description, session["dataSource"],
+            visualization, data_snapshot,
+        )
+        artifact_id = params[0]
 
-        artifact_id = self._generate_id()
-        now = self._now_iso()
-        artifact_data = {
-            "visualization": visualization,
-            "dataSnapshot": data_snapshot,
-        }
-
-        with self.conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO artifacts (id, session_id, insight_id, name, description, data_source, data, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id, session_id, insight_id, name, description, data_source, data, created_at
-                """,
-                (artifact_id, session_id, insight_id, name, description, session["dataSource"], json.dumps(artifact_data), now),
-            )
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.execute(INSERT_ARTIFACT_SQL + _ARTIFACT_RETURNING, params)
             row = cur.fetchone()
-        self.conn.commit()
 
         # Update insight's savedAsArtifact
         self.update_session(
@@ -378,24 +451,15 @@ class PgSessionStorage:
         if session is None:
             return None
 
-        artifact_id = self._generate_id()
-        now = self._now_iso()
-        artifact_data = {
-            "visualization": visualization,
-            "dataSnapshot": data_snapshot,
-        }
-
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute(
-                """
-                INSERT INTO artifacts (id, session_id, insight_id, name, description, data_source, data, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id, session_id, insight_id, name, description, data_source, data, created_at
-                """,
-                (artifact_id, session_id, None, title, description, session["dataSource"], json.dumps(artifact_data), now),
+                INSERT_ARTIFACT_SQL + _ARTIFACT_RETURNING,
+                self.new_artifact_row(
+                    session_id, None, title, description, session["dataSource"],
+                    visualization, data_snapshot,
+                ),
             )
             row = cur.fetchone()
-        self.conn.commit()
         return self._artifact_row_to_dict(row)
 
     def delete_artifact(self, artifact_id: str) -> bool:
@@ -413,9 +477,8 @@ class PgSessionStorage:
                     session_id, {"updateInsight": {"id": insight_id, "savedAsArtifact": None}}
                 )
 
-        with self.conn.cursor() as cur:
+        with self.conn.transaction(), self.conn.cursor() as cur:
             cur.execute("DELETE FROM artifacts WHERE id = %s", (artifact_id,))
-        self.conn.commit()
         return True
 
     # ── row converters ───────────────────────────────────────
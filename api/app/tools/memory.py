@@ -4,8 +4,14 @@ from datetime import UTC, datetime
 
 from app.storage.pg_session_storage import PgSessionStorage
 
-VALID_CATEGORIES = {"fact", "preference", "correction", "conclusion"}
-VALID_ACTIONS = {"add", "remove"}
+VALID_CATEGORIES = frozenset({"fact", "preference", "correction", "conclusion"})
+VALID_ACTIONS = frozenset({"add", "remove"})
+
+# Validation error templates, built once instead of re-sorting on every bad call
+_INVALID_ACTION_ERROR = "Invalid action '{}'. Must be one of: " + ", ".join(sorted(VALID_ACTIONS))
+_INVALID_CATEGORY_ERROR = "Invalid category '{}'. Must be one of: " + ", ".join(
+    sorted(VALID_CATEGORIES)
+)
 
 # Map singular category names to plural storage keys
 CATEGORY_TO_KEY = {
@@ -59,14 +65,14 @@ class MemoryTool:
         if action not in VALID_ACTIONS:
             return {
                 "success": False,
-                "error": f"Invalid action '{action}'. Must be one of: {', '.join(sorted(VALID_ACTIONS))}",
+                "error": _INVALID_ACTION_ERROR.format(action),
             }
 
         # Validate category
         if category not in VALID_CATEGORIES:
             return {
                 "success": False,
-                "error": f"Invalid category '{category}'. Must be one of: {', '.join(sorted(VALID_CATEGORIES))}",
+                "error": _INVALID_CATEGORY_ERROR.format(category),
             }
 
         # Validate content
@@ -76,13 +82,13 @@ class MemoryTool:
                 "error": "Content cannot be empty",
             }
 
-        # Load session
-        session = self._storage.get_session(session_id)
-        if session is None:
+        # Load memory (served from the storage's pending updates when hot)
+        memory = self._storage.get_memory(session_id)
+        if memory is None:
             return {"success": False, "error": f"Session '{session_id}' not found"}
 
         # Ensure memory structure exists (backward compat)
-        memory = session.get("memory") or _make_empty_memory()
+        memory = memory or _make_empty_memory()
 
         storage_key = CATEGORY_TO_KEY[category]
 
@@ -93,12 +99,14 @@ class MemoryTool:
             }
             memory[storage_key].append(entry)
         elif action == "remove":
-            memory[storage_key] = [
-                e for e in memory[storage_key] if e.get("content") != content
-            ]
-
-        # Persist
-        self._storage.update_session(session_id, {"memory": memory})
+            remaining = [e for e in memory[storage_key] if e.get("content") != content]
+            if len(remaining) == len(memory[storage_key]):
+                # Nothing matched; skip the write
+                return {"success": True, "noop": True}
+            memory[storage_key] = remaining
+
+        # Persist (deferred: written once when the agent flushes at end of turn)
+        self._storage.update_session_deferred(session_id, {"memory": memory})
 
         return {"success": True}
 
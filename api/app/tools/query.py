@@ -1,7 +1,33 @@
 """RunSQLTool - Execute SQL queries and create derived tables."""
 
+import re
+from collections import OrderedDict
 from typing import Any
 
+# Statements run_sql accepts: SELECT / WITH queries and CREATE TABLE ... AS SELECT,
+# optionally preceded by comments or opening parentheses
+_ALLOWED = re.compile(
+    r"""^(?:\s|--[^\n]*\n|/\*(?:[^*]|\*(?!/))*\*/|\()*
+    (?:
+        SELECT | WITH
+      | CREATE\s+(?:TEMP(?:ORARY)?\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?
+        (?:"[^"]+"|\S+)\s+AS\s*\(?\s*(?:SELECT|WITH)
+    )\b""",
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
+
+# Query results kept per tool instance for one agent turn, and invalidated sooner
+# when the loader's data changes
+_RESULT_CACHE_SIZE = 32
+
+# Functions whose result differs between identical runs; such queries are never cached
+_VOLATILE = re.compile(
+    r"\b(?:random|setseed|now|clock_timestamp|statement_timestamp|transaction_timestamp"
+    r"|timeofday|current_date|current_time|current_timestamp|localtime|localtimestamp"
+    r"|gen_random_uuid|nextval|setval)\b",
+    re.IGNORECASE,
+)
+
 
 class RunSQLTool:
     """
@@ -17,6 +43,8 @@ class RunSQLTool:
 
     def __init__(self, data_loader: Any):
         self._loader = data_loader
+        self._results: OrderedDict[str, dict] = OrderedDict()
+        self._results_version: int | None = None
 
     def execute(self, sql: str) -> dict:
         """
@@ -29,7 +57,42 @@ class RunSQLTool:
             Dict with data/columns/row_count for SELECT,
             or created_table/message for CREATE.
         """
+        # Reject anything else before it reaches the loader's parsing and the database
+        if not _ALLOWED.match(sql):
+            return {
+                "error": "Only SELECT, WITH and CREATE TABLE ... AS SELECT statements are allowed.",
+                "data": [],
+                "columns": [],
+            }
+
+        # Repeated pure queries against unchanged data reuse the previous result
+        version = self._loader.data_version
+        if version != self._results_version:
+            self._results.clear()
+            self._results_version = version
+        cached = self._results.get(sql)
+        if cached is not None:
+            self._results.move_to_end(sql)
+            return dict(cached)
+
         try:
-            return self._loader.execute_sql(sql)
+            result = self._loader.execute_sql(sql)
         except Exception as e:
             return {"error": f"SQL failed: {e}", "data": [], "columns": []}
+
+        if "message" not in result and not _VOLATILE.search(sql):
+            # Store a copy so callers annotating the returned dict don't alter the cache
+            self._results[sql] = dict(result)
+            if len(self._results) > _RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return result
+
+    def clear_cache(self) -> None:
+        """
+        Drop cached results.
+
+        The loader's data_version only sees this process's writes, so the agent
+        clears the cache at the start of each turn to pick up outside changes.
+        """
+        self._results.clear()
+        self._results_version = None
@@ -3,6 +3,8 @@
 from datetime import UTC, datetime
 from typing import Any
 
+import pandas as pd
+
 from app.tools.chart import ChartTool
 
 
@@ -27,8 +29,9 @@ class CreateReportTool:
             return {"error": "Report must have at least one section."}
 
         built_sections: list[dict] = []
-        all_data: list[Any] = []
-        all_columns: set[str] = set()
+        frames: list[pd.DataFrame] = []
+        # Chart results by spec, so repeated sections don't re-query the same table
+        chart_cache: dict[tuple, dict] = {}
 
         for section in sections:
             section_type = section.get("type")
@@ -40,14 +43,25 @@ class CreateReportTool:
                 })
 
             elif section_type == "chart":
-                chart_result = self._chart_tool.execute(
-                    table=section["table"],
-                    chart_type=section["chart_type"],
-                    x=section["x"],
-                    y=section["y"],
-                    title=section.get("title"),
-                    color=section.get("color"),
+                cache_key = (
+                    section["table"],
+                    section["chart_type"],
+                    section["x"],
+                    section["y"],
+                    section.get("color"),
+                    section.get("title"),
                 )
+                chart_result = chart_cache.get(cache_key)
+                if chart_result is None:
+                    chart_result = self._chart_tool.execute(
+                        table=section["table"],
+                        chart_type=section["chart_type"],
+                        x=section["x"],
+                        y=section["y"],
+                        title=section.get("title"),
+                        color=section.get("color"),
+                    )
+                    chart_cache[cache_key] = chart_result
 
                 if "error" in chart_result:
                     return {"error": f"Chart section '{section.get('title', 'untitled')}': {chart_result['error']}"}
@@ -61,9 +75,9 @@ class CreateReportTool:
 
                 # Accumulate data for snapshot
                 chart_data = chart_spec.get("data", [])
-                all_data.extend(chart_data)
-                if chart_data and isinstance(chart_data[0], dict):
-                    all_columns.update(chart_data[0].keys())
+                if chart_data:
+                    # object dtype keeps ints intact when concat pads other sections' columns
+                    frames.append(pd.DataFrame(chart_data, dtype=object))
 
             else:
                 return {"error": f"Unknown section type: {section_type}"}
@@ -73,10 +87,14 @@ class CreateReportTool:
             "sections": built_sections,
         }
 
+        # One concat for all sections; columns missing from a section become None
+        snapshot = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        snapshot = snapshot.where(snapshot.notna(), None)
         data_snapshot = {
-            "data": all_data,
-            "columns": sorted(all_columns),
-            "rowCount": len(all_data),
+            # Columnar (column -> values) instead of one dict per row
+            "data": snapshot.to_dict(orient="list"),
+            "columns": list(snapshot.columns),
+            "rowCount": len(snapshot),
             "capturedAt": datetime.now(UTC).isoformat(),
         }
 
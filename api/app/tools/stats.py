@@ -2,7 +2,29 @@
 StatsTool - Get statistics about a table.
 """
 
-from typing import Any
+from typing import Any, Callable
+
+from app.utils.sql_security import quote_identifier
+
+# PostgreSQL column types summarised as numeric; every other type (text, boolean,
+# date/time, ...) gets a categorical summary
+_NUMERIC_TYPES = frozenset({
+    "smallint", "integer", "bigint", "numeric", "real", "double precision",
+})
+
+# Summary statistics computed for every numeric column, as SQL aggregates
+_NUMERIC_AGGS = {
+    "count": "COUNT({col})",
+    "mean": "AVG({col})",
+    "std": "STDDEV_SAMP({col})",
+    "min": "MIN({col})",
+    "max": "MAX({col})",
+}
+_PERCENTILES = {"25%": 0.25, "50%": 0.5, "75%": 0.75}
+
+# Categorical summary limits
+_MAX_CATEGORICAL_COLUMNS = 5
+_TOP_VALUES = 5
 
 
 class StatsTool:
@@ -18,47 +40,117 @@ class StatsTool:
     def __init__(self, data_loader: Any):
         self._loader = data_loader
 
-    def execute(self, table: str) -> dict:
+    def execute(self, table: str, include_percentiles: bool = False) -> dict:
         """
         Get statistics for a table.
 
         Args:
             table: Name of the table to analyze
+            include_percentiles: Also compute quartiles for numeric columns
 
         Returns:
             Dict with row count, column info, and basic statistics
         """
-        # Efficient row count via SQL
-        count_result = self._loader.execute_sql(
-            f'SELECT COUNT(*) as cnt FROM {table}'
-        )
-        row_count = count_result["data"][0]["cnt"] if count_result["data"] else 0
-
-        # Full table for describe stats
-        df = self._loader.get_table(table)
+        # Columns, types and row count from the catalog; the table itself is never loaded
+        schema = self._loader.get_table_schema(table)
+        if "error" in schema:
+            return {"error": f"Unable to read table '{table}': {schema['error']}"}
 
+        dtypes = schema["dtypes"]
         result = {
             "table": table,
-            "row_count": row_count,
-            "columns": list(df.columns),
-            "dtypes": {col: str(df[col].dtype) for col in df.columns},
+            "row_count": schema["row_count"],
+            "columns": schema["columns"],
+            "dtypes": dtypes,
         }
 
-        # Add descriptive stats for numeric columns
-        numeric_cols = df.select_dtypes(include=["number"]).columns
-        if len(numeric_cols) > 0:
-            stats = df[numeric_cols].describe().to_dict()
-            result["numeric_stats"] = stats
-
-        # Add value counts for categorical columns (limited)
-        cat_cols = df.select_dtypes(include=["object", "category", "str"]).columns
-        if len(cat_cols) > 0:
-            result["categorical_summary"] = {}
-            for col in cat_cols[:5]:  # Limit to first 5 categorical columns
-                top_values = df[col].value_counts().head(5).to_dict()
-                result["categorical_summary"][col] = {
-                    "unique_count": df[col].nunique(),
-                    "top_values": {str(k): v for k, v in top_values.items()},
-                }
+        numeric_cols = [col for col, dtype in dtypes.items() if dtype in _NUMERIC_TYPES]
+        cat_cols = [col for col, dtype in dtypes.items() if dtype not in _NUMERIC_TYPES]
+        try:
+            # Add descriptive stats for numeric columns
+            if numeric_cols:
+                result["numeric_stats"] = self._numeric_stats(
+                    table, numeric_cols, include_percentiles
+                )
+
+            # Add value counts for categorical columns (limited), aggregated in the database
+            if cat_cols:
+                result["categorical_summary"] = self._categorical_summary(
+                    table, cat_cols[:_MAX_CATEGORICAL_COLUMNS]
+                )
+        except Exception as exc:
+            return {"error": f"Unable to compute statistics for '{table}': {exc}"}
 
         return result
+
+    def _numeric_stats(
+        self, table: str, columns: list[str], include_percentiles: bool,
+    ) -> dict:
+        """describe()-style statistics for numeric columns in one aggregate query."""
+        select = []
+        for i, col in enumerate(columns):
+            quoted = quote_identifier(col)
+            for name, template in _NUMERIC_AGGS.items():
+                select.append(f"{template.format(col=quoted)} AS {name}_{i}")
+            if include_percentiles:
+                fractions = ", ".join(str(f) for f in _PERCENTILES.values())
+                select.append(
+                    f"percentile_cont(ARRAY[{fractions}]) "
+                    f"WITHIN GROUP (ORDER BY {quoted}) AS pct_{i}"
+                )
+        row = self._query(table, lambda name: f"SELECT {', '.join(select)} FROM {name}")[0]
+
+        stats = {}
+        for i, col in enumerate(columns):
+            stats[col] = {name: _to_float(row[f"{name}_{i}"]) for name in _NUMERIC_AGGS}
+            if include_percentiles:
+                quartiles = row[f"pct_{i}"] or [None] * len(_PERCENTILES)
+                for label, value in zip(_PERCENTILES, quartiles):
+                    stats[col][label] = _to_float(value)
+        return stats
+
+    def _categorical_summary(self, table: str, columns: list[str]) -> dict:
+        """Top values and distinct counts for columns, in two aggregate queries."""
+        quoted = [quote_identifier(col) for col in columns]
+
+        # One COUNT(DISTINCT) per column in a single scan; counted on the text form so
+        # types without an equality operator (e.g. json) work too
+        distinct_row = self._query(table, lambda name: "SELECT " + ", ".join(
+            f"COUNT(DISTINCT {q}::text) AS u{i}" for i, q in enumerate(quoted)
+        ) + f" FROM {name}")[0]
+
+        # Top values for every column, one GROUP BY branch per column
+        top_rows = self._query(table, lambda name: " UNION ALL ".join(
+            f"(SELECT {i} AS i, {q}::text AS v, COUNT(*) AS n FROM {name} "
+            f"WHERE {q} IS NOT NULL GROUP BY 2 ORDER BY n DESC, v LIMIT {_TOP_VALUES})"
+            for i, q in enumerate(quoted)
+        ), require_rows=False)
+
+        summary = {
+            col: {"unique_count": distinct_row[f"u{i}"], "top_values": {}}
+            for i, col in enumerate(columns)
+        }
+        for row in top_rows:
+            summary[columns[row["i"]]]["top_values"][row["v"]] = row["n"]
+        return summary
+
+    def _query(
+        self, table: str, build_sql: Callable[[str], str], require_rows: bool = True,
+    ) -> list[dict]:
+        """
+        Run a statistics query against the table and return its rows.
+
+        build_sql gets the quoted PostgreSQL table name, so the generated SQL skips
+        run_sql's derived-name rewrite. Raises ValueError on an error or missing rows.
+        """
+        result = self._loader.query_table(table, build_sql)
+        if "error" in result:
+            raise ValueError(result["error"])
+        if require_rows and not result["data"]:
+            raise ValueError("query returned no rows")
+        return result["data"]
+
+
+def _to_float(value: Any) -> float | None:
+    """Convert a SQL aggregate (int, Decimal, float or NULL) to a JSON-friendly float."""
+    return None if value is None else float(value)
@@ -6,12 +6,14 @@ from typing import Any
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.ensemble import (
-    GradientBoostingClassifier,
-    GradientBoostingRegressor,
+    HistGradientBoostingClassifier,
+    HistGradientBoostingRegressor,
     RandomForestClassifier,
     RandomForestRegressor,
 )
+from sklearn.inspection import permutation_importance
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.metrics import (
     accuracy_score,
@@ -21,11 +23,16 @@ from sklearn.metrics import (
     r2_score,
 )
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
 
 # Max unique values for a numeric column to be treated as classification
 _CLASSIFICATION_THRESHOLD = 20
 
+# Permutation importance budget for models without built-in importances:
+# shuffles per feature, and held-out rows scored per shuffle
+_PERMUTATION_REPEATS = 3
+_PERMUTATION_MAX_ROWS = 2000
+
 
 class TrainModelTool:
     """Train supervised ML models and save predictions for residual analysis."""
@@ -72,18 +79,22 @@ class TrainModelTool:
         # Determine model type
         resolved_type = self._resolve_model_type(model_type, df[target])
 
-        # Prepare feature matrix
-        X, used_feature_names = self._prepare_features(df, feature_cols)
-        y = df[target].copy()
-
-        # Drop rows with NaN in features or target
-        mask = X.notna().all(axis=1) & y.notna()
-        X = X.loc[mask]
-        y = y.loc[mask]
+        # Drop rows with NaN in numeric features or target (one-hot columns never hold NaN)
+        num_cols, cat_cols = self._split_feature_types(df, feature_cols)
+        mask = df[num_cols].notna().all(axis=1) & df[target].notna()
+        df_clean = df.loc[mask].reset_index(drop=True)
+        y = df_clean[target].copy()
 
-        if len(X) < 2:
+        if len(df_clean) < 2:
             return {"error": "Not enough valid rows after dropping NaNs (need at least 2)."}
 
+        # Prepare feature matrix (rows align positionally with df_clean)
+        X, used_feature_names = self._prepare_features(df_clean, num_cols, cat_cols)
+
+        # Histogram gradient boosting bins features itself and needs dense input
+        if algorithm == "gradient_boosting" and sparse.issparse(X):
+            X = X.toarray()
+
         # Encode target for classification if needed
         label_encoder = None
         if resolved_type == "classification" and y.dtype == object:
@@ -94,22 +105,17 @@ class TrainModelTool:
         if split_by is not None:
             if split_by not in df.columns:
                 return {"error": f"split_by column '{split_by}' not found. Available: {list(df.columns)}"}
-            col = df.loc[mask, split_by]
+            col = df_clean[split_by]
             if not (pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col)):
                 return {"error": f"split_by column '{split_by}' is not sortable (must be numeric or datetime)."}
 
-            sorted_idx = col.values.argsort()
-            X = X.iloc[sorted_idx].reset_index(drop=True)
-            y = y.iloc[sorted_idx].reset_index(drop=True)
-            mask_indices = mask[mask].index
-            sorted_mask_indices = mask_indices[sorted_idx]
-            df_clean = df.loc[sorted_mask_indices].reset_index(drop=True)
-
-            split_point = int(len(X) * (1 - test_size))
-            X_train, X_test = X.iloc[:split_point], X.iloc[split_point:]
-            y_train, y_test = y.iloc[:split_point], y.iloc[split_point:]
+            # Earliest rows train, latest rows test; rows are gathered once per split
+            order = np.argsort(col.to_numpy(), kind="stable")
+            split_point = int(len(order) * (1 - test_size))
+            train_rows, test_rows = order[:split_point], order[split_point:]
+            X_train, X_test = X[train_rows], X[test_rows]
+            y_train, y_test = y.iloc[train_rows], y.iloc[test_rows]
         else:
-            df_clean = df.loc[mask]
             try:
                 X_train, X_test, y_train, y_test = train_test_split(
                     X, y, test_size=test_size, random_state=random_state,
@@ -124,18 +130,21 @@ class TrainModelTool:
         except Exception as exc:
             return {"error": f"Training failed: {exc}"}
 
-        # Compute metrics
+        # Predict once over all rows; train/test metrics slice the same array
+        preds_all = model.predict(X)
         metrics = self._compute_metrics(
-            model, X_train, y_train, X_test, y_test, resolved_type,
+            preds_all[y_train.index], y_train, preds_all[y_test.index], y_test, resolved_type,
         )
 
         # Feature importances
-        feature_importances = self._get_feature_importances(model, used_feature_names)
+        feature_importances = self._get_feature_importances(
+            model, used_feature_names, X_test, y_test, random_state,
+        )
 
         # Build predictions DataFrame
         pred_df = self._build_predictions_df(
-            df_clean, X, y, model, target, resolved_type,
-            X_train.index, X_test.index, label_encoder,
+            df_clean, preds_all, y, target, resolved_type,
+            y_train.index, y_test.index, label_encoder,
         )
         predictions_table = f"{target}_predictions"
         self._loader.register_dataframe(predictions_table, pred_df)
@@ -153,8 +162,8 @@ class TrainModelTool:
             "algorithm": algorithm,
             "target": target,
             "features_used": reported_features,
-            "train_size": len(X_train),
-            "test_size": len(X_test),
+            "train_size": X_train.shape[0],
+            "test_size": X_test.shape[0],
             "metrics": metrics,
             "feature_importances": feature_importances,
             "predictions_table": predictions_table,
@@ -170,16 +179,25 @@ class TrainModelTool:
 
     def _auto_select_features(self, df: pd.DataFrame, target: str) -> list[str]:
         """Select features automatically: numeric cols + low-cardinality categoricals."""
+        dtypes = df.dtypes
+        numeric = dtypes.map(pd.api.types.is_numeric_dtype).to_numpy()
         cols = []
-        for col in df.columns:
+        for col, dtype, is_numeric in zip(dtypes.index, dtypes, numeric):
             if col == target:
                 continue
-            if pd.api.types.is_numeric_dtype(df[col]):
+            if is_numeric:
                 cols.append(col)
-            elif pd.api.types.is_string_dtype(df[col]) and 1 < df[col].nunique() <= 50:
+            elif self._is_string_column(df, col, dtype) and 1 < df[col].nunique() <= 50:
                 cols.append(col)
         return cols
 
+    def _is_string_column(self, df: pd.DataFrame, col: str, dtype: Any) -> bool:
+        """String check from the dtype alone, inspecting values only for object columns."""
+        if dtype == object:
+            # Object columns may hold non-strings (e.g. Decimal from NUMERIC), so infer
+            return pd.api.types.is_string_dtype(df[col])
+        return pd.api.types.is_string_dtype(dtype)
+
     def _resolve_model_type(self, model_type: str, target_series: pd.Series) -> str:
         if model_type in ("regression", "classification"):
             return model_type
@@ -192,53 +210,72 @@ class TrainModelTool:
             return "classification"
         return "regression"
 
-    def _prepare_features(
+    def _split_feature_types(
         self, df: pd.DataFrame, feature_cols: list[str],
-    ) -> tuple[pd.DataFrame, list[str]]:
-        """Build feature matrix with one-hot encoding for categoricals."""
-        parts: list[pd.DataFrame] = []
+    ) -> tuple[list[str], list[str]]:
+        """Partition feature columns into numeric and categorical via one dtype scan."""
+        numeric = df.dtypes.loc[feature_cols].map(pd.api.types.is_numeric_dtype).to_numpy()
+        num_cols = [col for col, is_numeric in zip(feature_cols, numeric) if is_numeric]
+        cat_cols = [col for col, is_numeric in zip(feature_cols, numeric) if not is_numeric]
+        return num_cols, cat_cols
+
+    def _prepare_features(
+        self, df: pd.DataFrame, num_cols: list[str], cat_cols: list[str],
+    ) -> tuple[np.ndarray | sparse.csr_matrix, list[str]]:
+        """Build the feature matrix: dense numeric columns plus sparse one-hot categoricals."""
+        blocks: list[np.ndarray | sparse.csr_matrix] = []
         names: list[str] = []
-        for col in feature_cols:
-            if pd.api.types.is_numeric_dtype(df[col]):
-                parts.append(df[[col]])
-                names.append(col)
-            elif pd.api.types.is_string_dtype(df[col]):
-                dummies = pd.get_dummies(df[col], prefix=col, drop_first=False, dtype=float)
-                parts.append(dummies)
-                names.extend(dummies.columns.tolist())
-            else:
-                dummies = pd.get_dummies(df[col], prefix=col, drop_first=False, dtype=float)
-                parts.append(dummies)
-                names.extend(dummies.columns.tolist())
-        X = pd.concat(parts, axis=1)
+        if num_cols:
+            blocks.append(self._numeric_block(df, num_cols))
+            names.extend(num_cols)
+        if cat_cols:
+            encoder = OneHotEncoder(
+                sparse_output=True, dtype=np.float32, handle_unknown="ignore",
+            )
+            # The encoder rejects columns mixing strings and numbers, so encode the
+            # text form of every value and leave missing values missing
+            cats = df[cat_cols]
+            blocks.append(encoder.fit_transform(cats.astype(str).where(cats.notna())))
+            names.extend(encoder.get_feature_names_out(cat_cols).tolist())
+        if len(blocks) == 1:
+            X = blocks[0]
+            return (X.tocsr() if sparse.issparse(X) else X), names
+        # Mixed features need one matrix; only then is the numeric block stored sparse
+        X = sparse.hstack(blocks, format="csr")
         return X, names
 
+    def _numeric_block(self, df: pd.DataFrame, num_cols: list[str]) -> np.ndarray:
+        """Dense numeric features, downcast to float32 only when that round-trips exactly."""
+        values = df[num_cols].to_numpy(dtype=np.float64)
+        downcast = values.astype(np.float32)
+        if np.array_equal(downcast, values):
+            return downcast
+        return values
+
     def _create_model(self, model_type: str, algorithm: str, random_state: int) -> Any:
         if model_type == "regression":
             if algorithm == "gradient_boosting":
-                return GradientBoostingRegressor(random_state=random_state)
+                return HistGradientBoostingRegressor(random_state=random_state)
             if algorithm == "linear":
                 return LinearRegression()
-            return RandomForestRegressor(n_estimators=100, random_state=random_state)
+            return RandomForestRegressor(n_estimators=100, n_jobs=-1, random_state=random_state)
         else:
             if algorithm == "gradient_boosting":
-                return GradientBoostingClassifier(random_state=random_state)
+                return HistGradientBoostingClassifier(random_state=random_state)
             if algorithm == "linear":
                 return LogisticRegression(random_state=random_state, max_iter=1000)
-            return RandomForestClassifier(n_estimators=100, random_state=random_state)
+            return RandomForestClassifier(n_estimators=100, n_jobs=-1, random_state=random_state)
 
     def _compute_metrics(
         self,
-        model: Any,
-        X_train: pd.DataFrame,
+        preds_train: np.ndarray,
         y_train: pd.Series,
-        X_test: pd.DataFrame,
+        preds_test: np.ndarray,
         y_test: pd.Series,
         model_type: str,
     ) -> dict:
         metrics: dict[str, dict] = {}
-        for split_name, X, y in [("train", X_train, y_train), ("test", X_test, y_test)]:
-            preds = model.predict(X)
+        for split_name, preds, y in [("train", preds_train, y_train), ("test", preds_test, y_test)]:
             if model_type == "regression":
                 metrics[split_name] = {
                     "r2": float(r2_score(y, preds)),
@@ -253,7 +290,12 @@ class TrainModelTool:
         return metrics
 
     def _get_feature_importances(
-        self, model: Any, feature_names: list[str],
+        self,
+        model: Any,
+        feature_names: list[str],
+        X_eval: Any,
+        y_eval: pd.Series,
+        random_state: int,
     ) -> list[dict]:
         if hasattr(model, "feature_importances_"):
             importances = model.feature_importances_
@@ -262,6 +304,18 @@ class TrainModelTool:
             if len(importances) != len(feature_names):
                 # multi-class: average across classes
                 importances = np.abs(model.coef_).mean(axis=0)
+        elif X_eval.shape[0] > 0:
+            # HistGradientBoosting exposes no importances; measure the score drop on a
+            # capped sample of held-out rows so the cost stays bounded
+            if X_eval.shape[0] > _PERMUTATION_MAX_ROWS:
+                rows = np.random.default_rng(random_state).choice(
+                    X_eval.shape[0], _PERMUTATION_MAX_ROWS, replace=False,
+                )
+                X_eval, y_eval = X_eval[rows], y_eval.iloc[rows]
+            importances = permutation_importance(
+                model, X_eval, y_eval,
+                n_repeats=_PERMUTATION_REPEATS, random_state=random_state,
+            ).importances_mean
         else:
             return []
 
@@ -275,16 +329,14 @@ class TrainModelTool:
     def _build_predictions_df(
         self,
         original_df: pd.DataFrame,
-        X: pd.DataFrame,
+        preds: np.ndarray,
         y: pd.Series,
-        model: Any,
         target: str,
         model_type: str,
         train_idx: pd.Index,
         test_idx: pd.Index,
         label_encoder: LabelEncoder | None,
     ) -> pd.DataFrame:
-        preds = model.predict(X)
         if label_encoder is not None:
             preds = label_encoder.inverse_transform(preds)
 
@@ -293,11 +345,13 @@ class TrainModelTool:
         pred_df[pred_col] = preds
 
         if model_type == "regression":
-            pred_df["residual"] = pred_df[target].astype(float) - pred_df[pred_col].astype(float)
-
-        # Mark train/test split
-        split_labels = pd.Series("train", index=X.index)
-        split_labels.loc[test_idx] = "test"
-        pred_df["split"] = split_labels.values
+            # Single float32 subtraction; no intermediate float64 Series copies
+            actual = pred_df[target].to_numpy(dtype=np.float32, na_value=np.nan)
+            pred_df["residual"] = actual - np.asarray(preds, dtype=np.float32)
+
+        # Mark train/test split as a 1-byte categorical instead of per-row strings
+        is_test = np.zeros(len(y), dtype=np.int8)
+        is_test[y.index.get_indexer(test_idx)] = 1
+        pred_df["split"] = pd.Categorical.from_codes(is_test, categories=["train", "test"])
 
         return pred_df
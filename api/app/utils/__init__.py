@@ -10,6 +10,7 @@ from app.utils.sql_security import (
     validate_sql_is_select_only,
     validate_hex_color,
     sql_literal,
+    sql_literals,
 )
 
 __all__ = [
@@ -22,4 +23,5 @@ __all__ = [
     "validate_sql_is_select_only",
     "validate_hex_color",
     "sql_literal",
+    "sql_literals",
 ]
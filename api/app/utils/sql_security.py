@@ -5,15 +5,17 @@ Provides validation and safe construction of SQL queries to prevent injection at
 """
 
 import re
-from typing import Collection
+from functools import lru_cache
+from typing import Collection, Iterable
 
 
 # Regex for valid SQL identifiers (PostgreSQL)
 # Must start with letter or underscore, followed by letters, digits, underscores
 _VALID_IDENTIFIER_PATTERN = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
+_valid_identifier_match = _VALID_IDENTIFIER_PATTERN.match
 
-# Regex for hex color format
-_HEX_COLOR_PATTERN = re.compile(r'^#[0-9A-Fa-f]{6}$')
+# Allowed digits for hex colors (#RRGGBB)
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
 
 # Keywords that should not appear in a SELECT-only query
 _DANGEROUS_SQL_KEYWORDS = frozenset([
@@ -21,11 +23,38 @@ _DANGEROUS_SQL_KEYWORDS = frozenset([
     'GRANT', 'REVOKE', 'EXECUTE', 'COPY', 'VACUUM', 'REINDEX', 'CLUSTER',
 ])
 
-# SQL comment patterns to strip before validation
-_SQL_COMMENT_PATTERNS = [
-    re.compile(r'--[^\n]*'),  # Single line comments
-    re.compile(r'/\*.*?\*/', re.DOTALL),  # Multi-line comments
-]
+# All dangerous keywords as whole words, scanned case-insensitively in a single pass
+_DANGEROUS_KEYWORDS_RE = re.compile(
+    r'\b(?:' + '|'.join(sorted(_DANGEROUS_SQL_KEYWORDS)) + r')\b',
+    re.IGNORECASE,
+)
+
+# SQL comments: single line (--) or multi-line (/* */)
+_SQL_COMMENT = r'--[^\n]*|/\*.*?\*/'
+
+# A query that starts with SELECT, ignoring leading whitespace and comments
+_SELECT_PREFIX_RE = re.compile(
+    r'(?>\s|' + _SQL_COMMENT + r')*+SELECT\b', re.IGNORECASE | re.DOTALL
+)
+
+# Tokens that matter for validation, found in one pass over the raw query:
+# comments (ignored), quoted text (escape strings, dollar quotes, identifiers),
+# dangerous keywords, and semicolons (with any trailing whitespace/comments).
+# As in PostgreSQL, a $ inside an identifier (a$$) does not open a dollar quote.
+_SQL_TOKEN_RE = re.compile(
+    r"""
+      (?P<comment> """ + _SQL_COMMENT + r""" )
+    | (?P<quoted>
+          (?<!\w)[Ee]'(?:[^'\\]|''|\\.)*'
+        | '(?:[^']|'')*'
+        | "(?:[^"]|"")*"
+        | (?<![\w$])\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$
+      )
+    | (?P<keyword> \b(?:""" + '|'.join(sorted(_DANGEROUS_SQL_KEYWORDS)) + r""")\b )
+    | (?P<separator> ;(?>\s|;|""" + _SQL_COMMENT + r""")*+ )
+    """,
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
 
 
 class SQLSecurityError(ValueError):
@@ -33,6 +62,7 @@ class SQLSecurityError(ValueError):
     pass
 
 
+@lru_cache(maxsize=4096)
 def is_valid_identifier(name: str) -> bool:
     """
     Check if a name is a valid SQL identifier.
@@ -42,6 +72,8 @@ def is_valid_identifier(name: str) -> bool:
     - Contains only letters, digits, and underscores
     - Is not empty
 
+    Results are cached: identifiers come from a small schema vocabulary.
+
     Args:
         name: The identifier to validate
 
@@ -50,7 +82,7 @@ def is_valid_identifier(name: str) -> bool:
     """
     if not name or len(name) > 128:  # PostgreSQL max identifier length is 63, we're lenient
         return False
-    return bool(_VALID_IDENTIFIER_PATTERN.match(name))
+    return bool(_valid_identifier_match(name))
 
 
 def validate_identifier(name: str, identifier_type: str = "identifier") -> str:
@@ -86,6 +118,9 @@ def validate_identifier_in_allowlist(
     This is the primary defense against SQL injection - only identifiers
     that exist in the actual schema are allowed.
 
+    Intended for one-off checks; to validate many columns at once use
+    validate_column_names, which checks them all in a single pass.
+
     Args:
         name: The identifier to validate
         allowlist: Collection of allowed identifiers (e.g., column names from schema)
@@ -100,12 +135,18 @@ def validate_identifier_in_allowlist(
     if name not in allowlist:
         raise SQLSecurityError(
             f"Unknown {identifier_type}: '{name}'. "
-            f"Valid options: {', '.join(sorted(allowlist)[:10])}"
-            f"{'...' if len(allowlist) > 10 else ''}"
+            f"Valid options: {_allowlist_preview(frozenset(allowlist))}"
         )
     return name
 
 
+@lru_cache(maxsize=64)
+def _allowlist_preview(allowlist: frozenset[str]) -> str:
+    """First 10 allowed names in sorted order, cached so repeated misses don't re-sort."""
+    preview = ', '.join(sorted(allowlist)[:10])
+    return f"{preview}..." if len(allowlist) > 10 else preview
+
+
 def validate_column_names(
     columns: list[str],
     schema_columns: Collection[str],
@@ -121,10 +162,17 @@ def validate_column_names(
         The validated column list
 
     Raises:
-        SQLSecurityError: If any column is not in the schema
+        SQLSecurityError: If any column is not in the schema (all missing columns are listed)
     """
-    for col in columns:
-        validate_identifier_in_allowlist(col, schema_columns, "column")
+    # Freeze once so every lookup (and the error preview cache) uses the same set
+    schema_set = frozenset(schema_columns)
+    missing = [col for col in columns if col not in schema_set]
+    if missing:
+        label = "column" if len(missing) == 1 else "columns"
+        raise SQLSecurityError(
+            f"Unknown {label}: {', '.join(repr(col) for col in missing)}. "
+            f"Valid options: {_allowlist_preview(schema_set)}"
+        )
     return columns
 
 
@@ -141,19 +189,13 @@ def quote_identifier(name: str) -> str:
     Returns:
         The quoted identifier
     """
-    # Escape any existing double quotes by doubling them
+    # Escape any existing double quotes by doubling them (rare; skip the copy otherwise)
+    if '"' not in name:
+        return '"' + name + '"'
     escaped = name.replace('"', '""')
     return f'"{escaped}"'
 
 
-def _strip_comments(sql: str) -> str:
-    """Strip SQL comments from a query."""
-    result = sql
-    for pattern in _SQL_COMMENT_PATTERNS:
-        result = pattern.sub('', result)
-    return result
-
-
 def validate_sql_is_select_only(sql: str) -> str:
     """
     Validate that SQL is a SELECT statement only (no DDL/DML).
@@ -169,36 +211,39 @@ def validate_sql_is_select_only(sql: str) -> str:
     Raises:
         SQLSecurityError: If the SQL contains dangerous operations
     """
-    # Strip comments to prevent hiding dangerous keywords
-    clean_sql = _strip_comments(sql)
-
-    # Normalize whitespace and convert to uppercase for checking
-    normalized = ' '.join(clean_sql.upper().split())
-
-    # Must start with SELECT (after stripping leading whitespace)
-    stripped = normalized.strip()
-    if not stripped.startswith('SELECT'):
-        raise SQLSecurityError(
-            "Transformation SQL must be a SELECT statement. "
-            f"Found: {sql[:50]}{'...' if len(sql) > 50 else ''}"
-        )
-
-    # Check for dangerous keywords outside of string literals
-    # This is a conservative check - we look for keywords as whole words
-    for keyword in _DANGEROUS_SQL_KEYWORDS:
-        # Use word boundary matching to avoid false positives like "UPDATED_AT" column
-        pattern = rf'\b{keyword}\b'
-        if re.search(pattern, normalized):
-            raise SQLSecurityError(
-                f"Dangerous SQL keyword '{keyword}' not allowed in transformation. "
-                "Only SELECT queries are permitted."
-            )
-
-    # Check for multiple statements (semicolon outside strings)
-    # This is a simplified check - a proper SQL parser would be more robust
-    # Split by semicolon and check if there's more than one non-empty statement
-    parts = [p.strip() for p in clean_sql.split(';') if p.strip()]
-    if len(parts) > 1:
+    # Must start with SELECT, after any leading whitespace or comments
+    if not _SELECT_PREFIX_RE.match(sql):
+        raise _not_select_error(sql)
+
+    # Keywords are checked whole-word (so "UPDATED_AT" is fine) in code and, to stay
+    # conservative, inside quoted text too. Without comments or semicolons a single
+    # keyword search over the raw query settles it.
+    if ';' not in sql and '--' not in sql and '/*' not in sql:
+        match = _DANGEROUS_KEYWORDS_RE.search(sql)
+        if match:
+            raise _dangerous_keyword_error(match.group(0))
+        return sql
+
+    # Otherwise tokenize in one pass, nothing stripped or copied: comments are skipped,
+    # and a semicolon only counts when another statement follows it outside quotes
+    # and comments.
+    multiple_statements = False
+    for token in _SQL_TOKEN_RE.finditer(sql):
+        kind = token.lastgroup
+        if kind == 'separator':
+            # Anything left after the semicolon run is another statement
+            multiple_statements = multiple_statements or token.end() < len(sql)
+            continue
+        if kind == 'keyword':
+            match = token
+        elif kind == 'quoted':
+            match = _DANGEROUS_KEYWORDS_RE.search(token.group())
+        else:
+            continue
+        if match:
+            raise _dangerous_keyword_error(match.group(0))
+
+    if multiple_statements:
         raise SQLSecurityError(
             "Multiple SQL statements not allowed. Only a single SELECT is permitted."
         )
@@ -206,6 +251,22 @@ def validate_sql_is_select_only(sql: str) -> str:
     return sql
 
 
+def _dangerous_keyword_error(keyword: str) -> SQLSecurityError:
+    """Build the error raised when a transformation contains a DDL/DML keyword."""
+    return SQLSecurityError(
+        f"Dangerous SQL keyword '{keyword.upper()}' not allowed in transformation. "
+        "Only SELECT queries are permitted."
+    )
+
+
+def _not_select_error(sql: str) -> SQLSecurityError:
+    """Build the error raised when a transformation is not a SELECT."""
+    return SQLSecurityError(
+        "Transformation SQL must be a SELECT statement. "
+        f"Found: {sql[:50]}{'...' if len(sql) > 50 else ''}"
+    )
+
+
 def validate_hex_color(color: str | None) -> str | None:
     """
     Validate that a color string is a valid hex color.
@@ -222,7 +283,8 @@ def validate_hex_color(color: str | None) -> str | None:
     if color is None:
         return None
 
-    if not _HEX_COLOR_PATTERN.match(color):
+    # Plain length/prefix/set checks; int(x, 16) would also accept '0x', '_' and spaces
+    if len(color) != 7 or color[0] != '#' or not _HEX_DIGITS.issuperset(color[1:]):
         raise SQLSecurityError(
             f"Invalid color format: '{color}'. "
             "Must be a hex color in format #RRGGBB (e.g., #FF5733)."
@@ -230,6 +292,45 @@ def validate_hex_color(color: str | None) -> str | None:
     return color
 
 
+def _null_literal(value: None) -> str:
+    return "NULL"
+
+
+def _bool_literal(value: bool) -> str:
+    return "TRUE" if value else "FALSE"
+
+
+def _int_literal(value: int) -> str:
+    return str(value)
+
+
+def _float_literal(value: float) -> str:
+    # Handle special float values
+    if value != value:  # NaN
+        return "NULL"
+    elif value == float('inf') or value == float('-inf'):
+        raise TypeError("Infinity values cannot be converted to SQL literals")
+    return str(value)
+
+
+def _str_literal(value: str) -> str:
+    # Escape single quotes by doubling them (rare; skip the copy otherwise)
+    if "'" not in value:
+        return "'" + value + "'"
+    escaped = value.replace("'", "''")
+    return f"'{escaped}'"
+
+
+# Literal builders by exact type; bool precedes int so subclass fallback checks it first
+_LITERAL_HANDLERS = {
+    type(None): _null_literal,
+    bool: _bool_literal,
+    int: _int_literal,
+    float: _float_literal,
+    str: _str_literal,
+}
+
+
 def sql_literal(value) -> str:
     """
     Convert a Python value to a SQL literal safely.
@@ -243,22 +344,31 @@ def sql_literal(value) -> str:
     Raises:
         TypeError: If the value type is not supported
     """
-    if value is None:
-        return "NULL"
-    elif isinstance(value, bool):
-        return "TRUE" if value else "FALSE"
-    elif isinstance(value, int):
-        return str(value)
-    elif isinstance(value, float):
-        # Handle special float values
-        if value != value:  # NaN
-            return "NULL"
-        elif value == float('inf') or value == float('-inf'):
-            raise TypeError("Infinity values cannot be converted to SQL literals")
-        return str(value)
-    elif isinstance(value, str):
-        # Escape single quotes by doubling them
-        escaped = value.replace("'", "''")
-        return f"'{escaped}'"
-    else:
-        raise TypeError(f"Unsupported type for SQL literal: {type(value).__name__}")
+    handler = _LITERAL_HANDLERS.get(type(value))
+    if handler is None:
+        # Subclasses of supported types (e.g. numpy.float64, str enums)
+        for base, base_handler in _LITERAL_HANDLERS.items():
+            if isinstance(value, base):
+                handler = base_handler
+                break
+        else:
+            raise TypeError(f"Unsupported type for SQL literal: {type(value).__name__}")
+    return handler(value)
+
+
+def sql_literals(values: Iterable) -> str:
+    """
+    Convert many Python values to a comma-separated list of SQL literals.
+
+    Useful for building IN (...) lists and VALUES rows.
+
+    Args:
+        values: The values to convert
+
+    Returns:
+        SQL literals joined with ", "
+
+    Raises:
+        TypeError: If any value type is not supported
+    """
+    return ", ".join(map(sql_literal, values))
@@ -14,18 +14,18 @@ def pg_url():
     return os.getenv("DATABASE_URL", "postgresql://localhost/orbital")
 
 
-@pytest.fixture()
-def storage(pg_url):
+@pytest.fixture(scope="session")
+def session_storage(pg_url):
     """
-    Yield a PgSessionStorage wired to a real PostgreSQL database.
+    Yield one PgSessionStorage for the whole test run.
 
-    Drops both tables after each test to guarantee isolation.
+    Tables are created once up front and dropped when the run ends.
     """
     store = PgSessionStorage(pg_url)
     store.initialize()
     yield store
 
-    # Teardown: drop test tables so each test starts fresh
+    # Teardown: drop test tables so the next run starts fresh
     try:
         with store.conn.cursor() as cur:
             cur.execute("DROP TABLE IF EXISTS artifacts")
@@ -33,3 +33,17 @@ def storage(pg_url):
         store.conn.commit()
     finally:
         store.close()
+
+
+@pytest.fixture()
+def storage(session_storage):
+    """
+    Yield the shared PgSessionStorage wired to a real PostgreSQL database.
+
+    Each test runs inside a transaction that is rolled back afterwards, so
+    storage writes become savepoints and nothing reaches disk.
+    """
+    with session_storage.conn.transaction(force_rollback=True):
+        yield session_storage
+        # Write deferred updates inside the transaction so they are discarded too
+        session_storage.flush()
@@ -0,0 +1,34 @@
+"""Bulk row builders for PgSessionStorage tests that only need rows to exist."""
+
+from app.storage.pg_session_storage import (
+    INSERT_ARTIFACT_SQL,
+    INSERT_SESSION_SQL,
+    PgSessionStorage,
+)
+
+
+def bulk_create_sessions(
+    storage: PgSessionStorage, names: list[str], data_source: str = "custom"
+) -> list[str]:
+    """Insert empty sessions in one pipelined executemany; returns their ids in order."""
+    rows = [storage.new_session_row(data_source, name) for name in names]
+    with storage.conn.transaction(), storage.conn.cursor() as cur:
+        cur.executemany(INSERT_SESSION_SQL, rows)
+    return [row[0] for row in rows]
+
+
+def bulk_create_artifacts(
+    storage: PgSessionStorage,
+    session_id: str,
+    names: list[str],
+    visualization: dict,
+    data_snapshot: dict,
+) -> list[str]:
+    """Insert report artifacts for a session in one pipelined executemany; returns their ids."""
+    rows = [
+        storage.new_artifact_row(session_id, None, name, "", "custom", visualization, data_snapshot)
+        for name in names
+    ]
+    with storage.conn.transaction(), storage.conn.cursor() as cur:
+        cur.executemany(INSERT_ARTIFACT_SQL, rows)
+    return [row[0] for row in rows]
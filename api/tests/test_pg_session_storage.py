@@ -2,6 +2,10 @@
 
 import uuid
 
+import pytest
+
+from tests.helpers import bulk_create_artifacts, bulk_create_sessions
+
 
 # ── Session tests ────────────────────────────────────────────
 
@@ -185,6 +189,62 @@ class TestUpdateSession:
         assert result is None
 
 
+class TestDeferredUpdates:
+    def test_deferred_update_visible_before_flush(self, storage):
+        session = storage.create_session(data_source="custom", name="Defer")
+        memory = {"facts": [{"content": "a"}], "preferences": [], "corrections": [], "conclusions": []}
+        storage.update_session_deferred(session["id"], {"memory": memory})
+        assert storage.get_session(session["id"])["memory"] == memory
+        storage.flush()
+
+    def test_flush_persists_merged_updates(self, storage):
+        session = storage.create_session(data_source="custom", name="Defer")
+        storage.update_session_deferred(session["id"], {"name": "First"})
+        storage.update_session_deferred(session["id"], {"name": "Second"})
+        storage.flush(session["id"])
+
+        # Read the row directly so the pending overlay can't mask a missing write
+        with storage.conn.cursor() as cur:
+            cur.execute("SELECT name FROM sessions WHERE id = %s", (session["id"],))
+            assert cur.fetchone()[0] == "Second"
+
+    def test_update_session_folds_in_pending(self, storage):
+        session = storage.create_session(data_source="custom", name="Defer")
+        storage.update_session_deferred(session["id"], {"name": "Deferred"})
+        updated = storage.update_session(
+            session["id"], {"addMessage": {"role": "user", "content": "hi"}}
+        )
+        assert updated["name"] == "Deferred"
+        assert len(updated["messages"]) == 1
+
+    def test_get_memory_prefers_pending(self, storage):
+        session = storage.create_session(data_source="custom", name="Defer")
+        assert storage.get_memory(session["id"])["facts"] == []
+        memory = {"facts": [{"content": "b"}], "preferences": [], "corrections": [], "conclusions": []}
+        storage.update_session_deferred(session["id"], {"memory": memory})
+        assert storage.get_memory(session["id"]) is memory
+        storage.flush()
+
+    def test_get_memory_not_found(self, storage):
+        assert storage.get_memory(str(uuid.uuid4())) is None
+
+    def test_get_memory_null_memory_is_empty(self, storage):
+        session = storage.create_session(data_source="custom", name="Legacy")
+        with storage.conn.cursor() as cur:
+            cur.execute(
+                "UPDATE sessions SET data = jsonb_set(data, '{memory}', 'null') WHERE id = %s",
+                (session["id"],),
+            )
+        assert storage.get_memory(session["id"]) == {}
+
+    def test_deferred_rejects_append_updates(self, storage):
+        session = storage.create_session(data_source="custom", name="Defer")
+        with pytest.raises(ValueError):
+            storage.update_session_deferred(
+                session["id"], {"addMessage": {"role": "user", "content": "hi"}}
+            )
+
+
 class TestDeleteSession:
     def test_delete_session(self, storage):
         session = storage.create_session(data_source="custom", name="Del")
@@ -284,11 +344,10 @@ class TestCreateReportArtifact:
 
 class TestListArtifacts:
     def test_list_artifacts(self, storage):
-        session = storage.create_session(data_source="custom", name="List")
+        (session_id,) = bulk_create_sessions(storage, ["List"])
         viz = {"type": "report", "sections": []}
         snap = {"data": [], "columns": [], "rowCount": 0, "capturedAt": "2025-01-01T00:00:00"}
-        storage.create_report_artifact(session["id"], "A1", "", viz, snap)
-        storage.create_report_artifact(session["id"], "A2", "", viz, snap)
+        bulk_create_artifacts(storage, session_id, ["A1", "A2"], viz, snap)
 
         artifacts = storage.list_artifacts()
         assert len(artifacts) >= 2
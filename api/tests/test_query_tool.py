@@ -0,0 +1,98 @@
+"""Tests for RunSQLTool — statement gate and result cache (no database needed)."""
+
+import pytest
+
+from app.tools.query import RunSQLTool
+
+
+class FakeLoader:
+    """Loader stand-in that counts executions and exposes a settable data_version."""
+
+    def __init__(self):
+        self.data_version = 0
+        self.calls = []
+
+    def execute_sql(self, sql):
+        self.calls.append(sql)
+        return {"data": [{"n": len(self.calls)}], "columns": ["n"], "row_count": 1}
+
+
+@pytest.fixture()
+def loader():
+    return FakeLoader()
+
+
+@pytest.fixture()
+def tool(loader):
+    return RunSQLTool(loader)
+
+
+class TestStatementGate:
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT 1",
+            "(SELECT 1)",
+            "-- note\nSELECT 1",
+            "/* note */ WITH a AS (SELECT 1) SELECT * FROM a",
+            "CREATE TABLE x AS SELECT 1",
+            'create temp table "x y" as (with a as (select 1) select * from a)',
+        ],
+    )
+    def test_allowed(self, tool, loader, sql):
+        assert "error" not in tool.execute(sql)
+        assert loader.calls == [sql]
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "-- SELECT\nDROP TABLE t",
+            "/* SELECT */ DELETE FROM t",
+            "-- SELECT",
+            "CREATE TABLE x AS DELETE FROM t",
+            "DROP TABLE t",
+        ],
+    )
+    def test_rejected_before_loader(self, tool, loader, sql):
+        assert "error" in tool.execute(sql)
+        assert loader.calls == []
+
+
+class TestResultCache:
+    def test_repeat_query_is_cached(self, tool, loader):
+        first = tool.execute("SELECT n FROM t")
+        second = tool.execute("SELECT n FROM t")
+        assert second == first
+        assert len(loader.calls) == 1
+
+    def test_data_version_change_invalidates(self, tool, loader):
+        tool.execute("SELECT n FROM t")
+        loader.data_version += 1
+        result = tool.execute("SELECT n FROM t")
+        assert result["data"] == [{"n": 2}]
+        assert len(loader.calls) == 2
+
+    def test_clear_cache_forces_rerun(self, tool, loader):
+        tool.execute("SELECT n FROM t")
+        tool.clear_cache()
+        tool.execute("SELECT n FROM t")
+        assert len(loader.calls) == 2
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT now()",
+            "SELECT random() FROM t",
+            "SELECT CURRENT_TIMESTAMP",
+            "SELECT gen_random_uuid()",
+        ],
+    )
+    def test_volatile_queries_bypass_cache(self, tool, loader, sql):
+        tool.execute(sql)
+        tool.execute(sql)
+        assert len(loader.calls) == 2
+
+    def test_cached_result_is_a_copy(self, tool):
+        first = tool.execute("SELECT n FROM t")
+        first["extra"] = True
+        assert "extra" not in tool.execute("SELECT n FROM t")
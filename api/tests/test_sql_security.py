@@ -0,0 +1,78 @@
+"""Tests for validate_sql_is_select_only — adversarial quoting and comment inputs."""
+
+import pytest
+
+from app.utils import SQLSecurityError, validate_sql_is_select_only
+
+
+class TestAcceptsSingleSelect:
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT 1",
+            "SELECT 1;",
+            "SELECT 'a;b'",
+            "SELECT 'it''s; fine'",
+            "SELECT $$;$$",
+            "SELECT $tag$ ; SELECT 2 $tag$",
+            "SELECT a$b, $$;$$ FROM t",
+            'SELECT "a;b" FROM t',
+            "SELECT E'\\' ; SELECT 2'",  # \' keeps the E-string open
+            "SELECT 1 -- ; SELECT 2",
+            "/* note */ SELECT 1",
+            "-- note\nSELECT 1",
+            "SELECT updated_at, created_by FROM t",
+        ],
+    )
+    def test_accepted(self, sql):
+        assert validate_sql_is_select_only(sql) == sql
+
+
+class TestRejectsHiddenStatements:
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT '--' ; DROP TABLE t",
+            "SELECT E'\\'; DROP TABLE t",
+            "SELECT E'\\\\'; DROP TABLE t",
+            "SELECT 1 /* -- */; DROP TABLE t",
+            "SELECT 1 -- /*\n; DROP TABLE t",
+            "SELECT $$ x $$; DROP TABLE t",
+            "SELECT a$$ FROM t; DROP TABLE t --$$",
+        ],
+    )
+    def test_dangerous_keyword_rejected(self, sql):
+        with pytest.raises(SQLSecurityError):
+            validate_sql_is_select_only(sql)
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT 1; SELECT 2",
+            "SELECT '--' ; SELECT 2",
+            "SELECT '\\' ; SELECT 2",  # standard strings don't treat \ as an escape
+            "SELECT E'\\\\' ; SELECT 2",
+            "SELECT 1 /* -- */ ; SELECT 2",
+            "SELECT 1 /* ; */ ; SELECT 2",
+            "SELECT $$ ' $$ ; SELECT 2",
+            'SELECT "--" ; SELECT 2',
+            "SELECT a$$ FROM t; SELECT pg_sleep(100) --$$",
+            "SELECT a$b$ FROM t; SELECT 2 --$b$",
+        ],
+    )
+    def test_multiple_statements_rejected(self, sql):
+        with pytest.raises(SQLSecurityError, match="Multiple SQL statements"):
+            validate_sql_is_select_only(sql)
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "-- SELECT\nDROP TABLE t",
+            "/* SELECT */ DELETE FROM t",
+            "DELETE FROM t",
+            "-- SELECT",
+        ],
+    )
+    def test_non_select_rejected(self, sql):
+        with pytest.raises(SQLSecurityError):
+            validate_sql_is_select_only(sql)
@@ -0,0 +1,64 @@
+"""Tests for TrainModelTool — feature encoding and results (no database needed)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from app.tools.train_model import TrainModelTool
+
+
+class FakeLoader:
+    """Loader stand-in serving one DataFrame and capturing registered tables."""
+
+    def __init__(self, df):
+        self.df = df
+        self.registered = {}
+
+    def get_table(self, table):
+        return self.df
+
+    def register_dataframe(self, name, df):
+        self.registered[name] = df
+
+
+@pytest.fixture()
+def df():
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame({
+        "x": rng.random(n),
+        "mixed": pd.Series(["a", 1, 2.5, None] * (n // 4), dtype=object),
+        "y": rng.random(n) * 10,
+    })
+
+
+class TestCategoricalFeatures:
+    @pytest.mark.parametrize("algorithm", ["random_forest", "gradient_boosting", "linear"])
+    def test_mixed_type_column_trains(self, df, algorithm):
+        result = TrainModelTool(FakeLoader(df)).execute(
+            "t", "y", features=["x", "mixed"], algorithm=algorithm,
+        )
+        assert "error" not in result
+        assert result["features_used"] == ["x", "mixed"]
+
+    def test_mixed_type_column_keeps_missing_values_missing(self, df):
+        X, names = TrainModelTool(FakeLoader(df))._prepare_features(df, [], ["mixed"])
+        assert names == ["mixed_1", "mixed_2.5", "mixed_a", "mixed_nan"]
+        assert X[3].toarray().tolist() == [[0, 0, 0, 1]]
+
+
+class TestFeatureImportances:
+    def test_gradient_boosting_reports_permutation_importances(self, df):
+        result = TrainModelTool(FakeLoader(df)).execute(
+            "t", "y", features=["x", "mixed"], algorithm="gradient_boosting",
+        )
+        names = [item["feature"] for item in result["feature_importances"]]
+        assert sorted(names) == ["mixed_1", "mixed_2.5", "mixed_a", "mixed_nan", "x"]
+
+    def test_empty_held_out_split_reports_none(self, df):
+        model = HistGradientBoostingRegressor().fit(df[["x"]].to_numpy(), df["y"])
+        importances = TrainModelTool(FakeLoader(df))._get_feature_importances(
+            model, ["x"], np.empty((0, 1)), df["y"].iloc[:0], 0,
+        )
+        assert importances == []
@@ -8,7 +8,8 @@ Downloads housing-related datasets from public sources:
 3. FRED UNRATE (unemployment) — monthly unemployment rate
 4. FRED MORTGAGE30US (mortgage rates) — weekly 30yr fixed rate, resampled to monthly
 
-Output: data/demo/ (~2MB total)
+Output: data/demo/ (~2MB total), as CSV with a Parquet copy of each file
+Downloads are cached in ~/.cache/orbital-demo/ and only refetched when they change.
 
 Usage:
     cd .
@@ -17,12 +18,21 @@ Usage:
 
 from __future__ import annotations
 
-import io
+import hashlib
 import os
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
 from pathlib import Path
+from typing import NamedTuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import urllib3
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -47,23 +57,35 @@ START_YEAR = 2015
 END_YEAR = 2024
 TOP_N_METROS = 50
 
+# Zillow date headers and FRED observation dates are both ISO YYYY-MM-DD
+DATE_FORMAT = "%Y-%m-%d"
+
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "data" / "demo"
 OUTPUT_DIR_AGG = Path(__file__).resolve().parent.parent / "data" / "demo-aggregated"
 
+# Downloads are kept here and revalidated on later runs
+CACHE_DIR = Path.home() / ".cache" / "orbital-demo"
+
+# Shared keep-alive pool: the two Zillow and two FRED downloads reuse one connection per host
+_POOL = urllib3.PoolManager(
+    num_pools=4, maxsize=4, retries=urllib3.Retry(3, backoff_factor=0.3)
+)
+
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
 def download_csv(url: str, name: str) -> pd.DataFrame:
-    """Download a CSV from a URL into a DataFrame."""
+    """Download a CSV from a URL into a DataFrame, revalidating a local copy if cached."""
     try:
-        import urllib.request
-
-        print(f"  Downloading {name}...")
-        with urllib.request.urlopen(url, timeout=60) as resp:
-            data = resp.read()
-        return pd.read_csv(io.BytesIO(data))
+        path = fetch_cached(url, name)
+        if name.startswith("Z"):
+            # Zillow files are hundreds of numeric columns wide; parse them multithreaded
+            read_options = pa_csv.ReadOptions(use_threads=True)
+            return pa_csv.read_csv(path, read_options=read_options).to_pandas()
+        # FRED marks missing observations with "."; read them as NaN so values parse numeric
+        return pd.read_csv(path, engine="c", na_values=["."])
     except Exception as exc:
         print(f"  ERROR downloading {name}: {exc}")
         print(f"  URL: {url}")
@@ -71,80 +93,176 @@ def download_csv(url: str, name: str) -> pd.DataFrame:
         raise SystemExit(1)
 
 
-def process_zillow_wide_to_long(
-    df: pd.DataFrame, value_name: str, id_col: str = "RegionName"
-) -> pd.DataFrame:
+def fetch_cached(url: str, name: str) -> Path:
+    """
+    Return a local copy of url from CACHE_DIR, downloading only if it changed.
+    The cached body is revalidated with its ETag (or its mtime when the server sent none).
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha256(url.encode()).hexdigest()[:16]
+    body_path = CACHE_DIR / f"{key}.csv"
+    etag_path = CACHE_DIR / f"{key}.etag"
+
+    headers = {}
+    if body_path.exists():
+        if etag_path.exists():
+            headers["If-None-Match"] = etag_path.read_text()
+        else:
+            headers["If-Modified-Since"] = formatdate(body_path.stat().st_mtime, usegmt=True)
+
+    resp = _POOL.request("GET", url, headers=headers, timeout=60, preload_content=False)
+    try:
+        if resp.status == 304:
+            print(f"  {name} unchanged, using cached copy")
+            return body_path
+        if resp.status != 200:
+            raise RuntimeError(f"HTTP {resp.status}")
+
+        # Stream the body to disk, then swap it in so an interrupted run never leaves a partial file
+        print(f"  Downloading {name}...")
+        tmp_path = body_path.with_suffix(".part")
+        with tmp_path.open("wb") as f:
+            shutil.copyfileobj(resp, f)
+        tmp_path.replace(body_path)
+    finally:
+        resp.release_conn()
+
+    etag = resp.headers.get("ETag")
+    if etag:
+        etag_path.write_text(etag)
+    else:
+        etag_path.unlink(missing_ok=True)
+    return body_path
+
+
+class ZillowMatrix(NamedTuple):
+    """Zillow values as a (metro x date) matrix, with metros by name and dates in order."""
+
+    metros: np.ndarray
+    dates: pd.DatetimeIndex
+    values: np.ndarray
+
+    def to_long_df(self, value_name: str) -> pd.DataFrame:
+        """Pivot to long (metro, date, value) rows, skipping missing values."""
+        # Reshape row-major instead of melting; rows stay (metro, date)-sorted.
+        # Missing values are dropped with one mask before the frame is built.
+        values = self.values.ravel()
+        keep = ~np.isnan(values)
+        return pd.DataFrame({
+            "metro": np.repeat(self.metros, len(self.dates))[keep],
+            "date": np.tile(self.dates.to_numpy(), len(self.metros))[keep],
+            value_name: values[keep],
+        })
+
+    def national_average(self, value_name: str) -> pd.DataFrame:
+        """Average across metros per date, skipping dates with no data."""
+        counts = np.count_nonzero(~np.isnan(self.values), axis=0)
+        sums = np.nansum(self.values, axis=0, dtype=np.float64)
+        has_data = counts > 0
+        return pd.DataFrame({
+            "date": self.dates[has_data],
+            value_name: (sums[has_data] / counts[has_data]).astype(np.float32),
+        })
+
+
+def zillow_matrix(df: pd.DataFrame, id_col: str = "RegionName") -> ZillowMatrix:
     """
-    Pivot Zillow wide-format data to long format.
+    Extract the (metro x date) value matrix from Zillow wide-format data.
     Zillow CSVs have columns like: RegionID, SizeRank, RegionName, ..., 2015-01-31, 2015-02-28, ...
+    Keeps the top metros and the requested year range.
     """
-    # Identify date columns (YYYY-MM-DD pattern)
-    date_cols = [c for c in df.columns if len(c) == 10 and c[4] == "-"]
+    # Identify date columns (YYYY-MM-DD pattern) inside the requested year range;
+    # casting to U4 keeps just the year prefix for the range check
+    cols = np.asarray(df.columns, dtype=str)
+    years = cols.astype("U4")
+    is_date = (np.char.str_len(cols) == 10) & (np.char.find(cols, "-", 4, 5) == 4)
+    date_cols = cols[is_date & (years >= str(START_YEAR)) & (years <= str(END_YEAR))]
 
     # Filter to top metros by SizeRank
-    if "SizeRank" in df.columns:
-        df = df.nsmallest(TOP_N_METROS, "SizeRank")
+    if "SizeRank" in df.columns and len(df) > TOP_N_METROS:
+        # Selection, not a sort: only membership in the top N matters here
+        top = np.argpartition(df["SizeRank"].to_numpy(), TOP_N_METROS)[:TOP_N_METROS]
+        df = df.iloc[top]
 
-    # Melt to long format
-    long = df.melt(
-        id_vars=[id_col],
-        value_vars=date_cols,
-        var_name="date",
-        value_name=value_name,
-    )
-    long["date"] = pd.to_datetime(long["date"])
-    long = long.rename(columns={id_col: "metro"})
+    # Order metros by name and dates chronologically (ISO headers sort as strings), so the
+    # long pivot comes out already sorted by (metro, date)
+    df = df.iloc[np.argsort(df[id_col].to_numpy(), kind="stable")]
+    date_cols.sort()
 
-    # Filter date range
-    long = long[
-        (long["date"].dt.year >= START_YEAR) & (long["date"].dt.year <= END_YEAR)
-    ]
+    # Dollar amounts carry well under float32's ~7 significant digits
+    dates = pd.to_datetime(date_cols, format=DATE_FORMAT)
+    vals = df[date_cols].to_numpy(dtype=np.float32, na_value=np.nan)
+    return ZillowMatrix(df[id_col].to_numpy(), dates, vals)
 
-    # Drop NaN values
-    long = long.dropna(subset=[value_name])
 
-    return long.sort_values(["metro", "date"]).reset_index(drop=True)
-
-
-def process_fred_monthly(df: pd.DataFrame, value_col: str) -> pd.DataFrame:
-    """Process FRED data: parse dates, filter range, rename."""
+def _load_fred(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Extract (dates, values) arrays from a FRED CSV for the requested year range.
+    Rows outside the range or without a value are dropped with one mask before dates are parsed.
+    """
     # FRED CSVs have observation_date (or DATE) and the value column
     date_col = "observation_date" if "observation_date" in df.columns else "DATE"
     val_col = [c for c in df.columns if c != date_col][0]
 
-    result = pd.DataFrame()
-    result["date"] = pd.to_datetime(df[date_col])
-    result[value_col] = pd.to_numeric(df[val_col], errors="coerce")
+    # Raw YYYY-MM-DD strings order like dates, so the year range needs no parsing
+    raw_dates = df[date_col].astype(str).to_numpy()
+    values = pd.to_numeric(df[val_col], errors="coerce").to_numpy(dtype=np.float64)
+    keep = (raw_dates >= str(START_YEAR)) & (raw_dates < str(END_YEAR + 1)) & ~np.isnan(values)
+
+    dates = pd.to_datetime(raw_dates[keep], format=DATE_FORMAT, cache=True).to_numpy()
+    values = values[keep]
 
-    # Filter date range
-    result = result[
-        (result["date"].dt.year >= START_YEAR) & (result["date"].dt.year <= END_YEAR)
-    ]
+    # FRED series arrive in date order; only sort if one ever doesn't
+    if np.any(dates[1:] < dates[:-1]):
+        order = np.argsort(dates, kind="stable")
+        dates, values = dates[order], values[order]
+    return dates, values
 
-    return result.dropna().sort_values("date").reset_index(drop=True)
+
+def process_fred_monthly(df: pd.DataFrame, value_col: str) -> pd.DataFrame:
+    """Process FRED data: parse dates, filter range, rename."""
+    dates, values = _load_fred(df)
+    return pd.DataFrame({"date": dates, value_col: values})
 
 
 def process_fred_weekly_to_monthly(df: pd.DataFrame, value_col: str) -> pd.DataFrame:
     """Process FRED weekly data: resample to monthly averages."""
-    date_col = "observation_date" if "observation_date" in df.columns else "DATE"
-    val_col = [c for c in df.columns if c != date_col][0]
+    dates, values = _load_fred(df)
+
+    # Weekly -> monthly average: bucket by calendar month, then sum/count per bucket.
+    # Only months with observations get a bucket, and np.unique returns them in order.
+    # Rounded to 4 decimals (rates have 2) so float noise doesn't reach the CSV:
+    # 5.96, not 5.959999999999999.
+    months, codes = np.unique(dates.astype("datetime64[M]"), return_inverse=True)
+    means = np.bincount(codes, weights=values) / np.bincount(codes)
+    return pd.DataFrame({
+        "date": months.astype("datetime64[s]"),  # MS = month start
+        value_col: np.round(means, 4),
+    })
 
-    temp = pd.DataFrame()
-    temp["date"] = pd.to_datetime(df[date_col])
-    temp[value_col] = pd.to_numeric(df[val_col], errors="coerce")
 
-    # Filter date range
-    temp = temp[
-        (temp["date"].dt.year >= START_YEAR) & (temp["date"].dt.year <= END_YEAR)
-    ]
-    temp = temp.dropna()
+def save(df: pd.DataFrame, path: Path) -> None:
+    """Write a DataFrame as zstd Parquet for a .parquet path, otherwise as CSV."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if path.suffix == ".parquet":
+        pq.write_table(table, path, compression="zstd")
+        return
 
-    # Resample weekly -> monthly (average)
-    temp = temp.set_index("date")
-    monthly = temp.resample("MS").mean()  # MS = month start
-    monthly = monthly.dropna().reset_index()
+    # Demo dates are whole days; write them as YYYY-MM-DD rather than full timestamps
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
 
-    return monthly.sort_values("date").reset_index(drop=True)
+    # pyarrow's C++ writer quotes every header name, so the plain header is written by hand
+    with path.open("wb") as f:
+        f.write((",".join(table.column_names) + "\n").encode())
+        pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(include_header=False))
+
+
+def save_outputs(df: pd.DataFrame, csv_path: Path) -> None:
+    """Write the demo CSV plus a Parquet copy alongside it for pipeline consumers."""
+    save(df, csv_path)
+    save(df, csv_path.with_suffix(".parquet"))
 
 
 # ---------------------------------------------------------------------------
@@ -158,36 +276,47 @@ def main() -> None:
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+    # Fetch all four sources concurrently; processing below runs once they are in
+    print("\nDownloading sources")
+    sources = {
+        "ZHVI": ZHVI_URL,
+        "ZORI": ZORI_URL,
+        "UNRATE": FRED_UNRATE_URL,
+        "MORTGAGE30US": FRED_MORTGAGE_URL,
+    }
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        raw = dict(zip(sources, pool.map(download_csv, sources.values(), sources)))
+
     # 1. Home values (Zillow ZHVI)
     print("\n[1/4] Home values (Zillow ZHVI)")
-    zhvi_raw = download_csv(ZHVI_URL, "ZHVI")
-    home_values = process_zillow_wide_to_long(zhvi_raw, "home_value")
+    # Raw frames are popped as they are consumed; the ZHVI matrix is kept for the aggregate
+    zhvi = zillow_matrix(raw.pop("ZHVI"))
+    home_values = zhvi.to_long_df("home_value")
     out_path = OUTPUT_DIR / "home_values.csv"
-    home_values.to_csv(out_path, index=False)
-    print(f"  Saved: {out_path} ({len(home_values)} rows, {out_path.stat().st_size / 1024:.0f} KB)")
+    save_outputs(home_values, out_path)
+    home_values_rows = len(home_values)
+    del home_values  # the aggregated variant is computed from the matrix, not the long rows
+    print(f"  Saved: {out_path} ({home_values_rows} rows, {out_path.stat().st_size / 1024:.0f} KB)")
 
     # 2. Rents (Zillow ZORI)
     print("\n[2/4] Rents (Zillow ZORI)")
-    zori_raw = download_csv(ZORI_URL, "ZORI")
-    rents = process_zillow_wide_to_long(zori_raw, "rent")
+    rents = zillow_matrix(raw.pop("ZORI")).to_long_df("rent")
     out_path = OUTPUT_DIR / "rents.csv"
-    rents.to_csv(out_path, index=False)
+    save_outputs(rents, out_path)
     print(f"  Saved: {out_path} ({len(rents)} rows, {out_path.stat().st_size / 1024:.0f} KB)")
 
     # 3. Unemployment (FRED UNRATE)
     print("\n[3/4] Unemployment rate (FRED UNRATE)")
-    unrate_raw = download_csv(FRED_UNRATE_URL, "UNRATE")
-    economic = process_fred_monthly(unrate_raw, "unemployment_rate")
+    economic = process_fred_monthly(raw.pop("UNRATE"), "unemployment_rate")
     out_path = OUTPUT_DIR / "economic.csv"
-    economic.to_csv(out_path, index=False)
+    save_outputs(economic, out_path)
     print(f"  Saved: {out_path} ({len(economic)} rows, {out_path.stat().st_size / 1024:.0f} KB)")
 
     # 4. Mortgage rates (FRED MORTGAGE30US) — THE WITHHELD DATASET
     print("\n[4/4] Mortgage rates (FRED MORTGAGE30US) — withheld for demo")
-    mortgage_raw = download_csv(FRED_MORTGAGE_URL, "MORTGAGE30US")
-    mortgage_rates = process_fred_weekly_to_monthly(mortgage_raw, "mortgage_rate")
+    mortgage_rates = process_fred_weekly_to_monthly(raw.pop("MORTGAGE30US"), "mortgage_rate")
     out_path = OUTPUT_DIR / "mortgage_rates.csv"
-    mortgage_rates.to_csv(out_path, index=False)
+    save_outputs(mortgage_rates, out_path)
     print(f"  Saved: {out_path} ({len(mortgage_rates)} rows, {out_path.stat().st_size / 1024:.0f} KB)")
 
     # --- Aggregated variant (no metro column) ---
@@ -197,30 +326,26 @@ def main() -> None:
 
     OUTPUT_DIR_AGG.mkdir(parents=True, exist_ok=True)
 
-    # Home values → national monthly average
-    home_values_agg = (
-        home_values
-        .groupby("date", as_index=False)["home_value"]
-        .mean()
-        .sort_values("date")
-        .reset_index(drop=True)
-    )
+    # Home values → national monthly average, straight from the wide ZHVI matrix
+    home_values_agg = zhvi.national_average("home_value")
     out_path = OUTPUT_DIR_AGG / "home_values.csv"
-    home_values_agg.to_csv(out_path, index=False)
+    save_outputs(home_values_agg, out_path)
     print(f"  Saved: {out_path} ({len(home_values_agg)} rows)")
 
     # Economic + mortgage rates are the same (already national)
-    for fname in ("economic.csv", "mortgage_rates.csv"):
+    for fname in (
+        "economic.csv", "economic.parquet", "mortgage_rates.csv", "mortgage_rates.parquet",
+    ):
         src = OUTPUT_DIR / fname
         dst = OUTPUT_DIR_AGG / fname
-        dst.write_bytes(src.read_bytes())
+        shutil.copyfile(src, dst)
         print(f"  Copied: {dst}")
 
     # Summary
     print("\n" + "=" * 60)
     print("Demo data preparation complete!")
     print()
-    print(f"  data/demo/            — per-metro (50 cities, {len(home_values)} rows)")
+    print(f"  data/demo/            — per-metro (50 cities, {home_values_rows} rows)")
     print(f"  data/demo-aggregated/ — national average ({len(home_values_agg)} rows, no metro)")
     print()
     print("For the demo (aggregated version):")
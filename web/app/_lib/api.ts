@@ -146,7 +146,8 @@ export interface ArtifactSummary {
 
 export interface DataSnapshot {
   query?: string;
-  data: unknown[];
+  // Row records for chart artifacts; column -> values for report artifacts
+  data: unknown[] | Record<string, unknown[]>;
   columns: string[];
   rowCount: number;
   capturedAt: string;